@@ -1,11 +1,14 @@
 import os
+import re
+import time
+import asyncio
 import logging
+import functools
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
-from telegram import Update
+from telegram import Chat, Update
 from telegram.ext import Application, CommandHandler, ContextTypes
-from telegram.constants import ChatMemberStatus
 
 # Load environment variables
 load_dotenv()
@@ -18,31 +21,107 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Configuration constants
-DEBUG_MODE = False  # Changed to False for production (1-hour updates)
-UPDATE_INTERVAL = 60 if DEBUG_MODE else 3600  # 60 seconds (1 min) in debug, 3600 (1 hour) in production
-
-# Store countdown data (in production, consider using a database)
-countdown_data = {}
-
-def format_time_delta(time_delta: timedelta) -> str:
-    """Format timedelta into human readable string with days, hours, minutes."""
-    total_seconds = int(time_delta.total_seconds())
-    days, remainder = divmod(total_seconds, 86400)  # 86400 seconds in a day
-    hours, remainder = divmod(remainder, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    
-    parts = []
+EST = ZoneInfo('America/New_York')
+_now = datetime.now  # bound once for the per-update handlers
+# Reminders are sent at these offsets before launch (T-7d, T-3d, T-24h, T-6h, T-1h, T-5m, T-0)
+REMINDER_OFFSETS = [
+    timedelta(days=7),
+    timedelta(days=3),
+    timedelta(hours=24),
+    timedelta(hours=6),
+    timedelta(hours=1),
+    timedelta(minutes=5),
+    timedelta(0),
+]
+# Matches the /setcountdown argument format, YYYY-MM-DD HH:MM
+_DT_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2}) (\d{1,2}):(\d{1,2})')
+ADMIN_CACHE_TTL = 300  # Seconds before a chat's admin list is fetched again
+
+# Static halves of the automated update messages; only the remaining time and
+# launch time are filled in per update
+_TMPL_FINAL_PRE = "🚨 FINAL COUNTDOWN - LAUNCH IMMINENT! 🚨\n\n⏰ AgentAxis Token Launch in: "
+_TMPL_FINAL_SUF = "\nGet ready for liftoff! 🚀\nLaunch time: "
+_TMPL_UPDATE_PRE = "⏳ AgentAxis Token Launch Incoming! 🚀\n\nOnly "
+_TMPL_UPDATE_SUF = " left until liftoff! 💎\nLaunch time: "
+
+# Precomputed text for the minute and hour fields, indexed by their value
+_MINUTE_STRS = tuple(f"{m} minute{'s' if m != 1 else ''}" for m in range(60))
+_HOUR_STRS = tuple(f"{h} hour{'s' if h != 1 else ''}" for h in range(24))
+
+@functools.lru_cache(maxsize=4096)
+def _format_minutes(total_minutes: int) -> str:
+    """Format a whole number of minutes into days, hours, minutes (cached)."""
+    days = total_minutes // 1440  # 1440 minutes in a day
+    hours = (total_minutes // 60) % 24
+    minutes = total_minutes % 60
+
+    # Compose the string directly for each combination of non-zero fields
     if days:
-        parts.append(f"{days} day{'s' if days != 1 else ''}")
+        day_str = f"{days} day{'s' if days != 1 else ''}"
+        if hours and minutes:
+            return f"{day_str}, {_HOUR_STRS[hours]}, {_MINUTE_STRS[minutes]}"
+        if hours:
+            return f"{day_str}, {_HOUR_STRS[hours]}"
+        if minutes:
+            return f"{day_str}, {_MINUTE_STRS[minutes]}"
+        return day_str
+    if hours and minutes:
+        return f"{_HOUR_STRS[hours]}, {_MINUTE_STRS[minutes]}"
     if hours:
-        parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
+        return _HOUR_STRS[hours]
     if minutes:
-        parts.append(f"{minutes} minute{'s' if minutes != 1 else ''}")
-    if not parts:  # If less than a minute remaining
-        parts.append("less than a minute")
-    return ", ".join(parts)
+        return _MINUTE_STRS[minutes]
+    return "less than a minute"
+
+def format_time_delta(total_seconds: int) -> str:
+    """Format a number of seconds into human readable string with days, hours, minutes."""
+    if total_seconds < 60:
+        return "less than a minute"
+    if total_seconds < 3600:
+        return _MINUTE_STRS[total_seconds // 60]
+    return _format_minutes(total_seconds // 60)
+
+def countdown_job_name(end_time: datetime) -> str:
+    """Name shared by all reminder jobs for one launch time."""
+    return f"countdown_{end_time.isoformat()}"
+
+def active_countdowns(context: ContextTypes.DEFAULT_TYPE) -> dict[datetime, set[int]]:
+    """Chat ids waiting on each launch time, shared across all chats."""
+    return context.bot_data.setdefault('active_countdowns', {})
+
+def leave_countdown(context: ContextTypes.DEFAULT_TYPE, chat_id: int) -> None:
+    """Drop the chat's countdown, cancelling reminders nobody else is waiting on."""
+    countdown = context.chat_data.pop('countdown', None)
+    if countdown is None:
+        return
+
+    end_time = countdown['end_time']
+    groups = active_countdowns(context)
+    chats = groups.get(end_time)
+    if chats is None:
+        return
 
-async def check_admin(update: Update) -> bool:
+    chats.discard(chat_id)
+    if not chats:
+        del groups[end_time]
+        for job in context.job_queue.get_jobs_by_name(countdown_job_name(end_time)):
+            job.schedule_removal()
+
+async def _get_admins(
+    context: ContextTypes.DEFAULT_TYPE, chat: Chat, ttl: float = ADMIN_CACHE_TTL
+) -> frozenset[int]:
+    """Return the chat's admin user ids, refreshing the cached set after ttl seconds."""
+    # Cached in chat_data as (monotonic fetch time, admin ids)
+    cached = context.chat_data.get('admins')
+    now = time.monotonic()
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+
+    admins = frozenset(member.user.id for member in await chat.get_administrators())
+    context.chat_data['admins'] = (now, admins)
+    return admins
+
+async def check_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Check if the user is an admin in the group."""
     user = update.effective_user
     chat = update.effective_chat
@@ -50,13 +129,17 @@ async def check_admin(update: Update) -> bool:
     if chat.type not in ['group', 'supergroup']:
         await update.message.reply_text("This command can only be used in groups!")
         return False
+
+    # Bot senders and the anonymous-admin placeholder (GroupAnonymousBot) can
+    # never pass the admin check, so reject them before any API call
+    if user is None or user.is_bot:
+        return False
     
-    member = await chat.get_member(user.id)
-    return member.status in [ChatMemberStatus.OWNER, ChatMemberStatus.ADMINISTRATOR]
+    return user.id in await _get_admins(context, chat)
 
 async def set_countdown(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Set a countdown timer for AgentAxis token launch (admin only)."""
-    if not await check_admin(update):
+    if not await check_admin(update, context):
         await update.message.reply_text(
             "⚠️ Only administrators can set the launch countdown!\n"
             "Use /countdown to check the remaining time."
@@ -67,7 +150,10 @@ async def set_countdown(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         datetime_str = ' '.join(context.args)
         
         try:
-            target_datetime = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M')
+            match = _DT_RE.fullmatch(datetime_str)
+            if not match:
+                raise ValueError(datetime_str)
+            target_datetime = datetime(*map(int, match.groups()), tzinfo=EST)
         except ValueError:
             await update.message.reply_text(
                 "Invalid date/time format!\n"
@@ -76,9 +162,7 @@ async def set_countdown(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             )
             return
 
-        est_tz = ZoneInfo('America/New_York')
-        current_time = datetime.now(est_tz)
-        target_datetime = target_datetime.replace(tzinfo=est_tz)
+        current_time = _now(EST)
 
         if target_datetime <= current_time:
             await update.message.reply_text("Please set a future launch date and time!")
@@ -86,37 +170,47 @@ async def set_countdown(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
         chat_id = update.effective_chat.id
         
-        # Remove existing countdown job if any
-        if chat_id in countdown_data and 'job' in countdown_data[chat_id]:
-            countdown_data[chat_id]['job'].schedule_removal()
+        # Remove existing countdown if any
+        leave_countdown(context, chat_id)
+
+        # Launch time string never changes once set, so format it only once
+        end_str = target_datetime.strftime('%Y-%m-%d %H:%M %Z')
 
         # Store countdown data
-        countdown_data[chat_id] = {
+        context.chat_data['countdown'] = {
             'end_time': target_datetime,
+            'end_str': end_str,
             'set_by': update.effective_user.id
         }
 
-        # Schedule updates
-        job = context.job_queue.run_repeating(
-            send_countdown_update,
-            interval=UPDATE_INTERVAL,
-            first=0,
-            chat_id=chat_id,
-            name=f"countdown_{chat_id}",
-            data=target_datetime
-        )
-        
-        countdown_data[chat_id]['job'] = job
-
-        time_remaining = target_datetime - current_time
-        formatted_time = format_time_delta(time_remaining)
+        # Chats counting down to the same launch share one set of reminder jobs
+        groups = active_countdowns(context)
+        if target_datetime not in groups:
+            groups[target_datetime] = set()
+            # Schedule one-shot reminders at each offset that is still in the future
+            for offset in REMINDER_OFFSETS:
+                when = target_datetime - offset
+                if when <= current_time:
+                    continue
+                context.job_queue.run_once(
+                    send_countdown_update,
+                    when=when,
+                    name=countdown_job_name(target_datetime),
+                    data=(target_datetime, end_str),
+                    # Run late reminders instead of dropping them; a skipped T-0
+                    # job would never announce the launch or clean up its state
+                    job_kwargs={'misfire_grace_time': None}
+                )
+        groups[target_datetime].add(chat_id)
+
+        seconds_remaining = (target_datetime - current_time).total_seconds()
+        formatted_time = format_time_delta(int(seconds_remaining))
 
-        update_interval_text = "minute" if DEBUG_MODE else "hour"
         await update.message.reply_text(
             f"✅ AgentAxis Solana Token Launch Countdown Set! 🚀\n\n"
             f"🗓 Launch Date: 2025-02-13 5:00 PM EST\n"  # Hardcoded date display
             f"⏰ Time until launch: {formatted_time}\n\n"
-            f"Updates will be sent every {update_interval_text}\n"
+            f"Reminders will be sent as launch approaches\n"
             f"Stay tuned!\n\n"
             f"Use /countdown anytime to check remaining time!"
         )
@@ -132,41 +226,39 @@ async def set_countdown(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 async def get_countdown(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Check remaining time until token launch."""
     chat_id = update.effective_chat.id
-    
-    if chat_id not in countdown_data:
+    countdown = context.chat_data.get('countdown')
+
+    if countdown is None:
         await update.message.reply_text(
             "No launch countdown is currently set! ⏰\n"
             "Stay tuned for the upcoming AgentAxis token launch! 🚀"
         )
         return
 
-    est_tz = ZoneInfo('America/New_York')
-    current_time = datetime.now(est_tz)
-    end_time = countdown_data[chat_id]['end_time']
+    current_time = _now(EST)
+    end_time = countdown['end_time']
+    end_str = countdown['end_str']
     
-    time_remaining = end_time - current_time
-    seconds_remaining = time_remaining.total_seconds()
+    seconds_remaining = (end_time - current_time).total_seconds()
 
     if seconds_remaining <= 0:
+        # Clean up countdown data before awaiting, so concurrent updates see it gone
+        leave_countdown(context, chat_id)
         await update.message.reply_text(
             "🎉 AgentAxis Solana Token is LIVE! 🚀\n\n"
             "The wait is over! Join the action now! 🔥\n"
-            f"Launch time: {end_time.strftime('%Y-%m-%d %H:%M %Z')}"
+            f"Launch time: {end_str}"
         )
-        # Clean up countdown data
-        if 'job' in countdown_data[chat_id]:
-            countdown_data[chat_id]['job'].schedule_removal()
-        del countdown_data[chat_id]
         return
 
-    formatted_time = format_time_delta(time_remaining)
+    formatted_time = format_time_delta(int(seconds_remaining))
     
     if seconds_remaining <= 300:  # Last 5 minutes
         message = (
             "🚨 FINAL COUNTDOWN - LAUNCH IMMINENT! 🚨\n\n"
             f"AgentAxis Token Launch in: {formatted_time}\n"
             "Get ready! 🚀🔥\n\n"
-            f"Launch time: {end_time.strftime('%Y-%m-%d %H:%M %Z')}"
+            f"Launch time: {end_str}"
         )
     else:
         message = (
@@ -178,58 +270,44 @@ async def get_countdown(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     await update.message.reply_text(message)
 
 async def send_countdown_update(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Send automated countdown updates."""
-    job = context.job
-    chat_id = job.chat_id
-    target_time = job.data
-
-    est_tz = ZoneInfo('America/New_York')
-    current_time = datetime.now(est_tz)
-    
-    time_remaining = target_time - current_time
-    seconds_remaining = time_remaining.total_seconds()
-
-    if seconds_remaining <= 0:
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text=(
-                "🎉 AgentAxis Solana Token is LIVE! 🚀🔥\n\n"
-                "The wait is over! Join the action now!\n"
-                f"Launch time: {target_time.strftime('%Y-%m-%d %H:%M %Z')}"
-            )
-        )
-        # Clean up countdown data
-        if chat_id in countdown_data:
-            if 'job' in countdown_data[chat_id]:
-                countdown_data[chat_id]['job'].schedule_removal()
-            del countdown_data[chat_id]
+    """Send automated countdown updates to every chat waiting on this launch."""
+    target_time, end_str = context.job.data
+    chat_ids = list(active_countdowns(context).get(target_time, ()))
+    if not chat_ids:
         return
 
-    # If less than 2 minutes remaining, send more frequent updates
-    if seconds_remaining <= 120 and DEBUG_MODE:
-        next_interval = 10  # Update every 10 seconds for last 2 minutes
-        job.interval = next_interval
+    current_time = _now(EST)
     
-    formatted_time = format_time_delta(time_remaining)
+    seconds_remaining = (target_time - current_time).total_seconds()
 
-    if seconds_remaining <= 300:  # Last 5 minutes
+    if seconds_remaining <= 0:
         message = (
-            "🚨 FINAL COUNTDOWN - LAUNCH IMMINENT! 🚨\n\n"
-            f"⏰ AgentAxis Token Launch in: {formatted_time}\n"
-            "Get ready for liftoff! 🚀\n"
-            f"Launch time: {target_time.strftime('%Y-%m-%d %H:%M %Z')}"
+            "🎉 AgentAxis Solana Token is LIVE! 🚀🔥\n\n"
+            "The wait is over! Join the action now!\n"
+            f"Launch time: {end_str}"
         )
+        # Clean up countdown data
+        active_countdowns(context).pop(target_time, None)
+        for chat_id in chat_ids:
+            context.application.chat_data.get(chat_id, {}).pop('countdown', None)
     else:
-        message = (
-            "⏳ AgentAxis Token Launch Incoming! 🚀\n\n"
-            f"Only {formatted_time} left until liftoff! 💎\n"
-            f"Launch time: {target_time.strftime('%Y-%m-%d %H:%M %Z')}"
-        )
-
-    await context.bot.send_message(
-        chat_id=chat_id,
-        text=message
+        # Jobs fire at or just after their offset, so round rather than truncate
+        # to keep e.g. the T-1h reminder from reading "59 minutes"
+        formatted_time = format_time_delta(round(seconds_remaining))
+
+        if seconds_remaining <= 300:  # Last 5 minutes
+            message = _TMPL_FINAL_PRE + formatted_time + _TMPL_FINAL_SUF + end_str
+        else:
+            message = _TMPL_UPDATE_PRE + formatted_time + _TMPL_UPDATE_SUF + end_str
+
+    # Send to all chats at once; one failing chat must not stop the others
+    results = await asyncio.gather(
+        *(context.bot.send_message(chat_id=chat_id, text=message) for chat_id in chat_ids),
+        return_exceptions=True
     )
+    for chat_id, result in zip(chat_ids, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error sending countdown update to {chat_id}: {result}")
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle errors."""
@@ -243,18 +321,37 @@ def main() -> None:
         logger.error("No token provided!")
         return
 
-    # Create application
-    application = Application.builder().token(token).build()
+    # Create application; updates from different chats are processed concurrently
+    # so a slow Telegram API call in one chat doesn't hold up the others. The
+    # longer pool timeout (PTB default 1s) lets reminder fan-out wait for a free
+    # connection instead of failing when many sends are in flight at once.
+    application = (
+        Application.builder()
+        .token(token)
+        .pool_timeout(10.0)
+        .concurrent_updates(True)
+        .build()
+    )
 
     # Add command handlers
-    application.add_handler(CommandHandler("setcountdown", set_countdown))
-    application.add_handler(CommandHandler("countdown", get_countdown))
+    application.add_handler(CommandHandler("setcountdown", set_countdown, block=False))
+    application.add_handler(CommandHandler("countdown", get_countdown, block=False))
 
     # Add error handler
     application.add_error_handler(error_handler)
 
-    # Start the bot
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    # Start the bot; use a webhook when deployed with a public URL, polling otherwise
+    webhook_url = os.getenv('WEBHOOK_URL')
+    if webhook_url:
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=int(os.getenv('PORT', 8443)),
+            url_path=token,
+            webhook_url=f"{webhook_url}/{token}",
+            allowed_updates=["message"]
+        )
+    else:
+        application.run_polling(allowed_updates=["message"])
 
 if __name__ == '__main__':
     main()